@@ -1,13 +1,16 @@
 import sys
 import os
 import argparse
-from datetime import time
+from datetime import datetime, time
 sys.path.append(os.path.pardir)
 
 from my_school_menus.msm_api import Menus
 # We import the calendar class with 'as MSMCalendar' to avoid conflicts
-from my_school_menus.msm_calendar import Calendar as MSMCalendar
+from my_school_menus.msm_calendar import Calendar as MSMCalendar, RenderCache
+from my_school_menus.msm_pipeline import write_file
+from my_school_menus.msm_profile import Profiler
 from my_school_menus.msm_ui import Application
+from my_school_menus.msm_watch import Watcher, WatchTarget
 import tkinter as tk
 
 # School Configuration
@@ -36,11 +39,28 @@ DEBUG = False
 # Set to True to create separate breakfast and lunch files (in addition to combined)
 CREATE_SEPARATE_FILES = False
 
+# Watch Configuration
+# ===========================================
+# Used with --watch.  Intervals are in seconds.  Current and upcoming months are
+# polled every WATCH_MIN_INTERVAL, backing off to WATCH_MAX_INTERVAL while they
+# do not change.  Set WATCH_PAST_INTERVAL to None to stop polling past months.
+WATCH_MIN_INTERVAL = 15 * 60  # 15 minutes
+WATCH_MAX_INTERVAL = 24 * 60 * 60  # 1 day
+WATCH_PAST_INTERVAL = None
+
 
 def main():
     parser = argparse.ArgumentParser(description="Generate iCalendar files for school menus.")
     parser.add_argument('--ui', action='store_true', help='Launch the graphical user interface.')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and rewrite calendar files when menus change.')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the time and memory spent in each stage of the run.')
+    parser.add_argument('--profile-dir',
+                        help='Also write a cProfile dump for each stage to this directory (implies --profile).')
     args = parser.parse_args()
+    if args.watch and (args.profile or args.profile_dir):
+        parser.error("--profile and --profile-dir cannot be used with --watch")
 
     if args.ui:
         root = tk.Tk()
@@ -49,18 +69,42 @@ def main():
         app.mainloop()
         return
 
+    profiler = Profiler(profile_dir=args.profile_dir) if args.profile or args.profile_dir else None
     menus = Menus()
     cal = MSMCalendar(
         default_breakfast_time=BREAKFAST_TIME,
-        default_lunch_time=LUNCH_TIME
+        default_lunch_time=LUNCH_TIME,
+        profiler=profiler
     )
-    
+
+    if args.watch:
+        watch(menus, cal)
+        return
+
+    if profiler:
+        with profiler:
+            generate(menus, cal)
+        print(f"\n{profiler.summary()}")
+        if args.profile_dir:
+            print(f"cProfile dumps written to {args.profile_dir}")
+    else:
+        generate(menus, cal)
+
+
+def generate(menus, cal):
+    """
+    Write the calendar files for every published month.
+
+    :param menus: Menus API client.
+    :param cal: Calendar used to render events.
+    """
     # Process lunch menu if specified
     lunch_available_dates = []
     if LUNCH_MENU_ID:
         print(f"Fetching lunch menu information for district {DISTRICT_ID}, menu {LUNCH_MENU_ID}...")
         try:
-            lunch_menu = menus.get(district_id=DISTRICT_ID, menu_id=LUNCH_MENU_ID)
+            with cal.stage("fetch"):
+                lunch_menu = menus.get(district_id=DISTRICT_ID, menu_id=LUNCH_MENU_ID)
             lunch_available_dates = menus.menu_months(lunch_menu)
             print(f"Found {len(lunch_available_dates)} months with lunch menus: {', '.join(d.strftime('%Y-%m') for d in lunch_available_dates)}")
         except Exception as e:
@@ -71,7 +115,8 @@ def main():
     if BREAKFAST_MENU_ID:
         print(f"Fetching breakfast menu information for district {DISTRICT_ID}, menu {BREAKFAST_MENU_ID}...")
         try:
-            breakfast_menu = menus.get(district_id=DISTRICT_ID, menu_id=BREAKFAST_MENU_ID)
+            with cal.stage("fetch"):
+                breakfast_menu = menus.get(district_id=DISTRICT_ID, menu_id=BREAKFAST_MENU_ID)
             breakfast_available_dates = menus.menu_months(breakfast_menu)
             print(f"Found {len(breakfast_available_dates)} months with breakfast menus: {', '.join(d.strftime('%Y-%m') for d in breakfast_available_dates)}")
         except Exception as e:
@@ -83,34 +128,25 @@ def main():
     
     for date in all_dates:
         print(f"\nProcessing date: {date.year}-{date.month}")
-        
-        all_events = []  # Will hold all events for the month (breakfast and lunch)
-        
+
+        # Each menu's events are rendered once and shared by the separate and combined files
+        cache = RenderCache(cal)
+
         # Process lunch menu for this date if available
         if LUNCH_MENU_ID and date in lunch_available_dates:
             print(f"Processing lunch menu for {date.year}-{date.month}")
             try:
-                lunch_calendar_menu = menus.get(
-                    district_id=DISTRICT_ID, menu_id=LUNCH_MENU_ID, date=date
-                )
+                with cal.stage("fetch"):
+                    lunch_calendar_menu = menus.get(
+                        district_id=DISTRICT_ID, menu_id=LUNCH_MENU_ID, date=date
+                    )
                 lunch_events = cal.events(
                     lunch_calendar_menu, 
                     menu_type="lunch", 
                     include_time=INCLUDE_TIME
                 )
                 print(f"  Found {len(lunch_events)} lunch events")
-                
-                # Add lunch events to all events list
-                all_events.extend(lunch_events)
-                
-                # Write separate lunch file if requested
-                if CREATE_SEPARATE_FILES and lunch_events:
-                    lunch_calendar = cal.calendar(lunch_events)
-                    lunch_filepath = f"{os.path.dirname(os.path.realpath(__file__))}/{date.year}-{date.month:02}-lunch-{FILE_SUFFIX}"
-                    lunch_ical = cal.ical(lunch_calendar)
-                    with open(lunch_filepath, 'w', newline='') as f:
-                        f.write(lunch_ical)
-                    print(f"  Wrote separate lunch calendar to {lunch_filepath}")
+                cache.render("lunch", lunch_events)
             except Exception as e:
                 print(f"Error processing lunch menu: {e}")
         
@@ -118,54 +154,121 @@ def main():
         if BREAKFAST_MENU_ID and date in breakfast_available_dates:
             print(f"Processing breakfast menu for {date.year}-{date.month}")
             try:
-                breakfast_calendar_menu = menus.get(
-                    district_id=DISTRICT_ID, menu_id=BREAKFAST_MENU_ID, date=date
-                )
+                with cal.stage("fetch"):
+                    breakfast_calendar_menu = menus.get(
+                        district_id=DISTRICT_ID, menu_id=BREAKFAST_MENU_ID, date=date
+                    )
                 breakfast_events = cal.events(
                     breakfast_calendar_menu, 
                     menu_type="breakfast", 
                     include_time=INCLUDE_TIME
                 )
                 print(f"  Found {len(breakfast_events)} breakfast events")
-                
-                # Add breakfast events to all events list
-                all_events.extend(breakfast_events)
-                
-                # Write separate breakfast file if requested
-                if CREATE_SEPARATE_FILES and breakfast_events:
-                    breakfast_calendar = cal.calendar(breakfast_events)
-                    breakfast_filepath = f"{os.path.dirname(os.path.realpath(__file__))}/{date.year}-{date.month:02}-breakfast-{FILE_SUFFIX}"
-                    breakfast_ical = cal.ical(breakfast_calendar)
-                    with open(breakfast_filepath, 'w', newline='') as f:
-                        f.write(breakfast_ical)
-                    print(f"  Wrote separate breakfast calendar to {breakfast_filepath}")
+                cache.render("breakfast", breakfast_events)
             except Exception as e:
                 print(f"Error processing breakfast menu: {e}")
-        
-        # Create combined calendar file for this month
-        if all_events:
-            # Create the combined calendar
-            combined_calendar = cal.calendar(all_events)
-            filepath = f"{os.path.dirname(os.path.realpath(__file__))}/{date.year}-{date.month:02}-{FILE_SUFFIX}"
-            
-            print(f"Creating combined calendar with {len(all_events)} total events")
-            ical = cal.ical(combined_calendar)
-            
-            # Write the calendar file
-            print(f"Writing combined calendar file to {filepath}")
-            with open(filepath, 'w', newline='') as f:
-                f.write(ical)
-            print(f"Calendar file written successfully!")
-            
-            # Write a debug copy if requested
-            if DEBUG:
-                debug_filepath = f"{os.path.dirname(os.path.realpath(__file__))}/{date.year}-{date.month:02}-debug-{FILE_SUFFIX}"
-                with open(debug_filepath, 'w') as f:
-                    visible_crlf = ical.replace('\r\n', '\\r\\n\n')
-                    f.write(visible_crlf)
-                print(f"Debug file written to {debug_filepath}")
-        else:
-            print(f"No menu data available for {date.year}-{date.month}, skipping file creation.")
+
+        write_month_files(cache, date)
+
+
+def write_month_files(cache, date):
+    """
+    Write the calendar files for a month.
+
+    :param cache: RenderCache holding the month's rendered "lunch" and "breakfast" events.
+    :param date: Month of the events.
+    """
+    cal = cache.calendar
+    output_dir = os.path.dirname(os.path.realpath(__file__))
+    menu_types = [menu_type for menu_type in ("lunch", "breakfast") if cache.get(menu_type)]
+
+    # Write separate files if requested
+    if CREATE_SEPARATE_FILES:
+        for menu_type in menu_types:
+            filepath = f"{output_dir}/{date.year}-{date.month:02}-{menu_type}-{FILE_SUFFIX}"
+            with cal.stage("write"):
+                write_file(filepath, [cache.ical(menu_type)])
+            print(f"  Wrote separate {menu_type} calendar to {filepath}")
+
+    # Create combined calendar file for this month
+    if menu_types:
+        # Create the combined calendar from all events for the month (breakfast and lunch)
+        filepath = f"{output_dir}/{date.year}-{date.month:02}-{FILE_SUFFIX}"
+
+        print(f"Creating combined calendar with {sum(len(cache.get(t)) for t in menu_types)} total events")
+        ical = cache.ical(*menu_types)
+
+        # Write the calendar file
+        print(f"Writing combined calendar file to {filepath}")
+        with cal.stage("write"):
+            write_file(filepath, [ical])
+        print(f"Calendar file written successfully!")
+
+        # Write a debug copy if requested
+        if DEBUG:
+            debug_filepath = f"{output_dir}/{date.year}-{date.month:02}-debug-{FILE_SUFFIX}"
+            visible_crlf = ical.replace('\r\n', '\\r\\n\n')
+            write_file(debug_filepath, [visible_crlf], newline=None)
+            print(f"Debug file written to {debug_filepath}")
+    else:
+        print(f"No menu data available for {date.year}-{date.month}, skipping file creation.")
+
+
+def watch(menus, cal):
+    """
+    Poll the configured menus and rewrite only the months whose menus changed.
+
+    :param menus: Menus API client.
+    :param cal: Calendar used to render events.
+    """
+    targets = []
+    if LUNCH_MENU_ID:
+        targets.append(WatchTarget(district_id=DISTRICT_ID, menu_id=LUNCH_MENU_ID, menu_type="lunch"))
+    if BREAKFAST_MENU_ID:
+        targets.append(WatchTarget(district_id=DISTRICT_ID, menu_id=BREAKFAST_MENU_ID, menu_type="breakfast"))
+
+    if not targets:
+        print("No menus configured, nothing to watch.")
+        return
+
+    # Latest rendered events for each month, by menu type
+    month_caches = {}
+    # Months whose rendered events changed since their files were last written
+    dirty = set()
+
+    def on_change(target, month, menu):
+        print(f"\n{target.menu_type.capitalize()} menu changed for {month.year}-{month.month}")
+        key = (month.year, month.month)
+        cache = month_caches.setdefault(key, RenderCache(cal))
+        cache.release(target.menu_type)
+        try:
+            cache.render(target.menu_type, cal.iter_events(menu, menu_type=target.menu_type, include_time=INCLUDE_TIME))
+        except ValueError:
+            pass
+        dirty.add(key)
+
+    def on_cycle():
+        # Write each changed month once all of its menus have been polled, so a combined file
+        # never holds a single menu type while the other one is still loading or failing
+        for key in sorted(dirty):
+            if watcher.is_polled(key):
+                write_month_files(month_caches[key], datetime(*key, 1))
+                dirty.discard(key)
+        # Drop months that will not be polled again
+        for key in list(month_caches):
+            if key not in dirty and watcher.is_finished(key):
+                del month_caches[key]
+
+    watcher = Watcher(
+        targets,
+        on_change,
+        menus=menus,
+        min_interval=WATCH_MIN_INTERVAL,
+        max_interval=WATCH_MAX_INTERVAL,
+        past_interval=WATCH_PAST_INTERVAL
+    )
+    print(f"Watching {len(targets)} menus for changes...")
+    watcher.run(on_error=lambda e: print(f"Error polling menus: {e}"), on_cycle=on_cycle)
 
 
 if __name__ == '__main__':
@@ -1,9 +1,18 @@
+import re
+import time
+import random
 import requests
+import threading
+from collections import deque
 from datetime import datetime
 from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
 DOMAIN = 'myschoolmenus.com'
 
+# Status codes worth retrying; anything else is returned to the caller as an error immediately
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
 
 @dataclass
 class RequestParams:
@@ -12,7 +21,88 @@ class RequestParams:
     exception_message: str = None
 
 
+@dataclass
+class RetryPolicy:
+    timeout: float = 10.0
+    deadline: float = 30.0
+    retries: int = 3
+    backoff: float = 0.5
+    max_backoff: float = 8.0
+    hedge_percentile: float = None
+    hedge_min_samples: int = 20
+    breaker_threshold: int = 5
+    breaker_reset: float = 30.0
+
+
+class CircuitOpenError(ValueError):
+    pass
+
+
+class RetryableError(ValueError):
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class CircuitBreaker:
+    def __init__(self, threshold: int, reset_timeout: float, clock=time.monotonic):
+        """
+        Initialize a circuit breaker that rejects requests after repeated failures.
+
+        After threshold consecutive failures the breaker opens.  Once reset_timeout seconds have
+        passed a single trial request is allowed; it closes the breaker on success and reopens it
+        on failure.
+
+        :param threshold: Consecutive failures that open the breaker.
+        :param reset_timeout: Seconds to wait before allowing a trial request.
+        :param clock: Monotonic clock function.
+        """
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """
+        Check whether a request may be sent.
+
+        :return: True if the breaker is closed or a trial request is due.
+        :rtype: bool
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._trial and self.clock() - self.opened_at >= self.reset_timeout:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.threshold:
+                self.opened_at = self.clock()
+                self._trial = False
+
+
 class Request:
+    # Default resilience settings for every request; assign a new RetryPolicy to change them
+    policy = RetryPolicy()
+
+    _breakers = {}
+    _latencies = {}
+    _lock = threading.Lock()
+    _executor = None
+
     def __init__(self):
         pass
 
@@ -27,6 +117,169 @@ class Request:
 
         return f"https://{DOMAIN}{path}"
 
+    @staticmethod
+    def endpoint(path: str) -> str:
+        """
+        Get the endpoint of a path, with IDs and dates replaced by a placeholder.
+
+        :param path: Request path.
+
+        :return: Endpoint template.
+        :rtype: str
+        """
+
+        return re.sub(r'\d+', '{id}', path)
+
+    @classmethod
+    def breaker(cls, endpoint: str, policy: RetryPolicy) -> CircuitBreaker:
+        """
+        Get the circuit breaker of an endpoint.
+
+        :param endpoint: Endpoint template.
+        :param policy: Retry policy used to create a missing breaker.
+
+        :return: Circuit breaker.
+        :rtype: CircuitBreaker
+        """
+
+        with cls._lock:
+            breaker = cls._breakers.get(endpoint)
+            if breaker is None:
+                breaker = cls._breakers[endpoint] = CircuitBreaker(policy.breaker_threshold, policy.breaker_reset)
+            return breaker
+
+    @classmethod
+    def hedge_delay(cls, endpoint: str, policy: RetryPolicy) -> float:
+        """
+        Get the latency after which a duplicate request is sent.
+
+        :param endpoint: Endpoint template.
+        :param policy: Retry policy.
+
+        :return: Delay in seconds, or None if hedging is disabled or there are too few samples.
+        :rtype: float
+        """
+
+        if policy.hedge_percentile is None:
+            return None
+        with cls._lock:
+            samples = sorted(cls._latencies.get(endpoint, ()))
+        if len(samples) < policy.hedge_min_samples:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * policy.hedge_percentile / 100))
+        return samples[index]
+
+    @classmethod
+    def _record_latency(cls, endpoint: str, latency: float):
+        with cls._lock:
+            cls._latencies.setdefault(endpoint, deque(maxlen=200)).append(latency)
+
+    @classmethod
+    def _attempt(cls, url: str, headers: dict, timeout: float, endpoint: str):
+        start = time.monotonic()
+        try:
+            response = requests.get(url=url, headers=headers, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            raise RetryableError(f"Endpoint {url} failed: {e}") from e
+        if response.status_code in RETRY_STATUS_CODES:
+            raise RetryableError(
+                f"Endpoint {url} returned status code {response.status_code}: {response.reason}",
+                status_code=response.status_code
+            )
+        cls._record_latency(endpoint, time.monotonic() - start)
+        return response
+
+    @classmethod
+    def _hedged_attempt(cls, url: str, headers: dict, timeout: float, endpoint: str, delay: float,
+                        deadline: float):
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(thread_name_prefix='msm-hedge')
+        pending = {cls._executor.submit(cls._attempt, url, headers, timeout, endpoint)}
+        done, pending = wait(pending, timeout=min(delay, deadline - time.monotonic()))
+        if not done:
+            # The first request is slower than usual; race a duplicate against it
+            pending.add(cls._executor.submit(cls._attempt, url, headers, timeout, endpoint))
+        error = None
+        while True:
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not pending:
+                raise error
+            remaining = deadline - time.monotonic()
+            if remaining > 0:
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if remaining <= 0 or not done:
+                # Abandon the requests still running; their responses are discarded
+                raise RetryableError(f"Endpoint {url} did not respond before the request deadline")
+
+    @classmethod
+    def fetch(cls, url: str, headers: dict = None, endpoint: str = None, policy: RetryPolicy = None):
+        """
+        Send a GET request with a deadline, retries with jittered exponential backoff, optional
+        hedged duplicate requests, and a circuit breaker per endpoint.
+
+        The deadline bounds when attempts start, each attempt's timeout and the wait for hedged
+        attempts.  An attempt that is not hedged is limited by the requests connect and read
+        timeouts, so a response that keeps trickling in can still run past the deadline.
+
+        The breaker is checked once per call and records a single failure once the retries are
+        exhausted.  A final 500 response is an error for this resource only and is not counted, so
+        one broken menu does not open the breaker for every menu sharing the endpoint.
+
+        :param url: Request URL.
+        :param headers: Request headers.
+        :param endpoint: Endpoint template used for the circuit breaker and latency tracking.
+        :param policy: Retry policy (default: Request.policy).
+
+        :return: Response that was not retryable.
+        :rtype: requests.Response
+        """
+
+        policy = policy or cls.policy
+        endpoint = endpoint or url
+        breaker = cls.breaker(endpoint, policy)
+        deadline = time.monotonic() + policy.deadline
+        if not breaker.allow():
+            raise CircuitOpenError(f"Endpoint {endpoint} is failing, not sending request to {url}")
+        try:
+            response = cls._retry(url, headers, endpoint, policy, deadline)
+        except RetryableError as e:
+            if e.status_code == 500:
+                # The server answered, so the endpoint is up even though this resource is broken
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+            raise
+        except Exception:
+            # Any other failure still counts, so a failed trial request reopens the breaker
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return response
+
+    @classmethod
+    def _retry(cls, url: str, headers: dict, endpoint: str, policy: RetryPolicy, deadline: float):
+        attempt = 0
+        while True:
+            timeout = min(policy.timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                raise RetryableError(f"Endpoint {url} did not respond within {policy.deadline} seconds")
+            try:
+                delay = cls.hedge_delay(endpoint, policy)
+                if delay is not None and delay < timeout:
+                    return cls._hedged_attempt(url, headers, timeout, endpoint, delay, deadline)
+                return cls._attempt(url, headers, timeout, endpoint)
+            except RetryableError:
+                # Full jitter keeps many clients from retrying in lockstep
+                sleep = random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** attempt))
+                attempt += 1
+                if attempt > policy.retries or time.monotonic() + sleep >= deadline:
+                    raise
+                time.sleep(sleep)
+
     @staticmethod
     def get(params: RequestParams) -> dict:
         """
@@ -39,7 +292,7 @@ class Request:
         """
 
         url = f"{Request.url(params.path)}"
-        response = requests.get(url=url, headers=params.headers)
+        response = Request.fetch(url=url, headers=params.headers, endpoint=Request.endpoint(params.path))
         if response.status_code != 200:
             raise ValueError(
                 f"Endpoint {url} returned status code {response.status_code}: {response.reason}"
@@ -54,7 +307,7 @@ class Request:
             raise ValueError(
                 f"Unable to decode JSON response"
             )
-        return response.json()
+        return json
 
 
 class Menus:
@@ -1,17 +1,34 @@
 import json
 import uuid
+from typing import Iterable, Iterator
+from contextlib import nullcontext
 from datetime import datetime, time, timedelta
 
+_NO_STAGE = nullcontext()
+
+
 class Calendar:
-    def __init__(self, default_breakfast_time=time(8, 0), default_lunch_time=time(12, 0)):
+    def __init__(self, default_breakfast_time=time(8, 0), default_lunch_time=time(12, 0), profiler=None):
         """
         Initialize the Calendar with default times for meals.
 
         :param default_breakfast_time: Default time for breakfast events (default: 8:00 AM)
         :param default_lunch_time: Default time for lunch events (default: 12:00 PM)
+        :param profiler: Optional msm_profile.Profiler recording the parse, build, render and fold stages.
         """
         self.default_breakfast_time = default_breakfast_time
         self.default_lunch_time = default_lunch_time
+        self.profiler = profiler
+
+    def stage(self, name: str):
+        """
+        Get a context manager that records a stage with the profiler, if one is set.
+
+        :param name: Stage name.
+
+        :return: Stage context manager.
+        """
+        return self.profiler.stage(name) if self.profiler else _NO_STAGE
 
     def events(self, menu: json, menu_type: str = "lunch", include_time: bool = False) -> list:
         """
@@ -24,13 +41,37 @@ class Calendar:
         :return: List of events.
         :rtype: list
         """
-        event_list = []
+        return list(self.iter_events(menu, menu_type=menu_type, include_time=include_time))
+
+    def iter_events(self, menu: json, menu_type: str = "lunch", include_time: bool = False) -> Iterator[dict]:
+        """
+        Lazily generate events from a menu.  Each entry is parsed only when the next event is requested.
+
+        :param menu: json menu.
+        :param menu_type: Type of menu ("breakfast" or "lunch").
+        :param include_time: Whether to include time in events.
+
+        :return: Iterator of events.
+        :rtype: Iterator[dict]
+        """
         menu_data = menu['data']
         if not menu_data:
             raise ValueError(
                 f"Missing menu data."
             )
+        return self._iter_events(menu_data, menu_type, include_time)
 
+    def _iter_events(self, menu_data: list, menu_type: str, include_time: bool) -> Iterator[dict]:
+        """
+        Generate events from validated menu data.
+
+        :param menu_data: Menu entries.
+        :param menu_type: Type of menu ("breakfast" or "lunch").
+        :param include_time: Whether to include time in events.
+
+        :return: Iterator of events.
+        :rtype: Iterator[dict]
+        """
         # Set the event time based on menu type
         event_time = None
         if include_time:
@@ -44,64 +85,86 @@ class Calendar:
                 continue
             
             try:
-                # Use menu_type from parameter to determine which prefix to use
-                prefix = "L: " if menu_type.lower() == "lunch" else "B: "
-                
-                # Process each item in the menu
-                recipe_count = 0
-                category_count = 0
-                summary = ""
-                description_parts = []
-                
-                for item in json.loads(entry['setting'])['current_display']:
-                    if item['type'] == 'recipe' and recipe_count == 0:
-                        recipe_count += 1
-                        summary = f"{prefix}{item['name']}"
-                    
-                    if item['type'] == 'category' and category_count == 0:
-                        category_count += 1
-                        description_parts.append(f"{item['name']}:")
-                    elif item['type'] == 'category':
-                        description_parts.append("")  # Empty line
-                        description_parts.append(f"{item['name']}:")
-                    else:
-                        description_parts.append(item['name'])
-                
-                if summary == '':
-                    continue
-                
-                # Create event dictionary instead of using icalendar library
-                event = {
-                    'summary': summary,
-                    'description': description_parts,
-                    'uid': str(uuid.uuid4()),
-                    'dtstamp': datetime.now(),
-                    'transp': 'OPAQUE'
-                }
-                
-                entry_date = datetime.fromisoformat(entry['day']).date()
-                
-                # Add time to the event if requested
-                if include_time and event_time:
-                    event_datetime = datetime.combine(entry_date, event_time)
-                    event['dtstart'] = event_datetime
-                    
-                    # Add event duration (30 minutes for breakfast, 45 minutes for lunch)
-                    if menu_type.lower() == "breakfast":
-                        duration = timedelta(minutes=30)
-                    else:
-                        duration = timedelta(minutes=45)
-                    
-                    end_time = event_datetime + duration
-                    event['dtend'] = end_time
-                else:
-                    event['dtstart'] = entry_date
-                
-                event_list.append(event)
+                with self.stage("parse"):
+                    display = json.loads(entry['setting'])['current_display']
             except KeyError:
                 continue
 
-        return event_list
+            with self.stage("build"):
+                event = self._event(entry, display, menu_type, include_time, event_time)
+            if event is not None:
+                yield event
+
+    def _event(self, entry: dict, display: list, menu_type: str, include_time: bool, event_time: time):
+        """
+        Build an event from a menu entry.
+
+        :param entry: Menu entry.
+        :param display: Parsed current_display items of the entry.
+        :param menu_type: Type of menu ("breakfast" or "lunch").
+        :param include_time: Whether to include time in events.
+        :param event_time: Start time of timed events.
+
+        :return: Event dictionary, or None if the entry has no recipe.
+        :rtype: dict
+        """
+        try:
+            # Use menu_type from parameter to determine which prefix to use
+            prefix = "L: " if menu_type.lower() == "lunch" else "B: "
+
+            # Process each item in the menu
+            recipe_count = 0
+            category_count = 0
+            summary = ""
+            description_parts = []
+
+            for item in display:
+                if item['type'] == 'recipe' and recipe_count == 0:
+                    recipe_count += 1
+                    summary = f"{prefix}{item['name']}"
+
+                if item['type'] == 'category' and category_count == 0:
+                    category_count += 1
+                    description_parts.append(f"{item['name']}:")
+                elif item['type'] == 'category':
+                    description_parts.append("")  # Empty line
+                    description_parts.append(f"{item['name']}:")
+                else:
+                    description_parts.append(item['name'])
+
+            if summary == '':
+                return None
+
+            # Create event dictionary instead of using icalendar library
+            event = {
+                'summary': summary,
+                'description': description_parts,
+                'uid': str(uuid.uuid4()),
+                'dtstamp': datetime.now(),
+                'transp': 'OPAQUE'
+            }
+
+            entry_date = datetime.fromisoformat(entry['day']).date()
+
+            # Add time to the event if requested
+            if include_time and event_time:
+                event_datetime = datetime.combine(entry_date, event_time)
+                event['dtstart'] = event_datetime
+
+                # Add event duration (30 minutes for breakfast, 45 minutes for lunch)
+                if menu_type.lower() == "breakfast":
+                    duration = timedelta(minutes=30)
+                else:
+                    duration = timedelta(minutes=45)
+
+                end_time = event_datetime + duration
+                event['dtend'] = end_time
+            else:
+                event['dtstart'] = entry_date
+
+            return event
+        except KeyError:
+            return None
 
     def combine_calendars(self, calendar_list: list) -> list:
         """
@@ -137,53 +200,99 @@ class Calendar:
         :return: Properly formatted iCal string.
         :rtype: str
         """
-        lines = [
+        return "".join(self.iter_ical(events))
+
+    def iter_ical(self, events: Iterable[dict]) -> Iterator[str]:
+        """
+        Lazily render events as iCal text.  Joining the chunks gives the same string as ical().
+
+        :param events: Iterable of event dictionaries.
+
+        :return: Iterator of iCal chunks, one per event plus the calendar header and footer.
+        :rtype: Iterator[str]
+        """
+        return self.assemble(self.vevent(event) for event in events)
+
+    @staticmethod
+    def assemble(blocks: Iterable[str]) -> Iterator[str]:
+        """
+        Wrap rendered VEVENT blocks in a calendar.
+
+        :param blocks: Iterable of VEVENT blocks from vevent().
+
+        :return: Iterator of iCal chunks.
+        :rtype: Iterator[str]
+        """
+        # Every line ends with CRLF except the last one
+        yield "\r\n".join([
             "BEGIN:VCALENDAR",
             "VERSION:2.0",
             "PRODID:-//My School Menus//EN",
             "CALSCALE:GREGORIAN",
-            "METHOD:PUBLISH"
-        ]
+            "METHOD:PUBLISH",
+            ""
+        ])
+        yield from blocks
+        yield "END:VCALENDAR"
+
+    def vevent(self, event: dict) -> str:
+        """
+        Render a single event as a VEVENT block, including its trailing CRLF.
+
+        :param event: Event dictionary.
+
+        :return: VEVENT block.
+        :rtype: str
+        """
+        with self.stage("render"):
+            lines = self._vevent_lines(event)
+            lines.append("")
+            return "\r\n".join(lines)
+
+    def _vevent_lines(self, event: dict) -> list:
+        """
+        Get the iCal lines of a single event.
+
+        :param event: Event dictionary.
+
+        :return: VEVENT lines.
+        :rtype: list
+        """
+        lines = ["BEGIN:VEVENT"]
         
-        for event in events:
-            lines.append("BEGIN:VEVENT")
-            
-            # Add summary
-            lines.append(f"SUMMARY:{event['summary']}")
-            
-            # Add start time/date
-            if isinstance(event['dtstart'], datetime):
-                dt_str = event['dtstart'].strftime("%Y%m%dT%H%M%S")
-                lines.append(f"DTSTART:{dt_str}")
-            else:
-                dt_str = event['dtstart'].strftime("%Y%m%d")
-                lines.append(f"DTSTART;VALUE=DATE:{dt_str}")
-            
-            # Add end time/date if present
-            if 'dtend' in event:
-                dt_str = event['dtend'].strftime("%Y%m%dT%H%M%S")
-                lines.append(f"DTEND:{dt_str}")
-            
-            # Add timestamp
-            dt_str = event['dtstamp'].strftime("%Y%m%dT%H%M%SZ")
-            lines.append(f"DTSTAMP:{dt_str}")
-            
-            # Add UID
-            lines.append(f"UID:{event['uid']}")
-            
-            # Add description with proper folding
-            description = "\\n".join(event['description'])
+        # Add summary
+        lines.append(f"SUMMARY:{event['summary']}")
+        
+        # Add start time/date
+        if isinstance(event['dtstart'], datetime):
+            dt_str = event['dtstart'].strftime("%Y%m%dT%H%M%S")
+            lines.append(f"DTSTART:{dt_str}")
+        else:
+            dt_str = event['dtstart'].strftime("%Y%m%d")
+            lines.append(f"DTSTART;VALUE=DATE:{dt_str}")
+        
+        # Add end time/date if present
+        if 'dtend' in event:
+            dt_str = event['dtend'].strftime("%Y%m%dT%H%M%S")
+            lines.append(f"DTEND:{dt_str}")
+        
+        # Add timestamp
+        dt_str = event['dtstamp'].strftime("%Y%m%dT%H%M%SZ")
+        lines.append(f"DTSTAMP:{dt_str}")
+        
+        # Add UID
+        lines.append(f"UID:{event['uid']}")
+        
+        # Add description with proper folding
+        description = "\\n".join(event['description'])
+        with self.stage("fold"):
             lines.extend(self._fold_content("DESCRIPTION", description))
-            
-            # Add transparency
-            lines.append(f"TRANSP:{event['transp']}")
-            
-            lines.append("END:VEVENT")
         
-        lines.append("END:VCALENDAR")
+        # Add transparency
+        lines.append(f"TRANSP:{event['transp']}")
         
-        # Join with proper line endings for iCalendar (CRLF)
-        return "\r\n".join(lines)
+        lines.append("END:VEVENT")
+        return lines
     
     @staticmethod
     def _fold_content(property_name, content):
@@ -231,4 +340,93 @@ class Calendar:
         :param hour: Hour (0-23)
         :param minute: Minute (0-59)
         """
-        self.default_lunch_time = time(hour, minute)
\ No newline at end of file
+        self.default_lunch_time = time(hour, minute)
+
+
+class RenderCache:
+    def __init__(self, calendar: Calendar, keep: set = None):
+        """
+        Initialize a cache of rendered VEVENT blocks.
+
+        Events are rendered once per key and any number of calendars can then be assembled from
+        the cached blocks of one or more keys, so formatting work grows with the number of events
+        rather than the number of output files.
+
+        :param calendar: Calendar used to render events.
+        :param keep: Keys whose blocks are cached, or None to cache every key.  Events of other
+            keys are rendered lazily and not kept.
+        """
+        self.calendar = calendar
+        self.keep = keep
+        self._blocks = {}
+
+    def __contains__(self, key) -> bool:
+        return key in self._blocks
+
+    def __len__(self) -> int:
+        return len(self._blocks)
+
+    def render(self, key, events: Iterable[dict]) -> Iterable[str]:
+        """
+        Render events under a key, unless the key is already cached.
+
+        :param key: Cache key, e.g. a menu type or a (district, menu, month) tuple.
+        :param events: Iterable of event dictionaries.  Not consumed when the key is cached.
+
+        :return: VEVENT blocks for the key; a lazy iterator when the key is not kept.
+        :rtype: Iterable[str]
+        """
+        blocks = self._blocks.get(key)
+        if blocks is None and self.keep is not None and key not in self.keep:
+            return (self.calendar.vevent(event) for event in events)
+        if blocks is None:
+            blocks = self._blocks[key] = tuple(self.calendar.vevent(event) for event in events)
+        return blocks
+
+    def get(self, key, default=None) -> tuple:
+        """
+        Get the VEVENT blocks cached under a key.
+
+        :param key: Cache key.
+        :param default: Value returned when the key is not cached.
+
+        :return: VEVENT blocks for the key.
+        :rtype: tuple
+        """
+        return self._blocks.get(key, default)
+
+    def release(self, key):
+        """
+        Drop the VEVENT blocks cached under a key.
+
+        :param key: Cache key.
+        """
+        self._blocks.pop(key, None)
+
+    def clear(self):
+        """
+        Drop all cached VEVENT blocks.
+        """
+        self._blocks.clear()
+
+    def iter_ical(self, *keys) -> Iterator[str]:
+        """
+        Lazily assemble a calendar from the blocks cached under one or more keys.
+
+        :param keys: Cache keys, in output order.
+
+        :return: Iterator of iCal chunks.
+        :rtype: Iterator[str]
+        """
+        return self.calendar.assemble(block for key in keys for block in self._blocks[key])
+
+    def ical(self, *keys) -> str:
+        """
+        Assemble a calendar from the blocks cached under one or more keys.
+
+        :param keys: Cache keys, in output order.
+
+        :return: Properly formatted iCal string.
+        :rtype: str
+        """
+        return "".join(self.iter_ical(*keys))
@@ -0,0 +1,209 @@
+import os
+import json
+import hashlib
+
+CONFIG_FILE = 'config.json'
+FIELDS = ('District ID', 'Site ID', 'Lunch Menu ID', 'Breakfast Menu ID')
+
+
+class ConfigStore:
+    def __init__(self, path: str = CONFIG_FILE, compact_after: int = 500):
+        """
+        Initialize a store for school configurations.
+
+        Edits are appended to a journal next to the config file instead of rewriting it.  The
+        journal is folded back into the config file, written atomically, once it holds
+        compact_after edits or when save() is called.  The journal starts with a digest of the
+        config file it applies to, so a journal left behind by an interrupted save is ignored, and
+        with the IDs of the file's configurations, so IDs stay stable across saves.
+
+        :param path: Path of the config file.
+        :param compact_after: Number of journaled edits that triggers a rewrite of the config file.
+        """
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.compact_after = compact_after
+        self.configs = {}
+        self._next_id = 0
+        self._journaled = 0
+        self._digest = None
+
+    def __len__(self) -> int:
+        return len(self.configs)
+
+    def __iter__(self):
+        return iter(self.configs.items())
+
+    @staticmethod
+    def normalize(config) -> dict:
+        """
+        Get a configuration as a dictionary with every field, with values as strings so that
+        values read from config.json and values typed into the UI compare equal.
+
+        :param config: Configuration dictionary, or list of values in FIELDS order.
+
+        :return: Configuration dictionary.
+        :rtype: dict
+        """
+        if not isinstance(config, dict):
+            config = dict(zip(FIELDS, config))
+        return {field: '' if config.get(field) is None else str(config[field]) for field in FIELDS}
+
+    @staticmethod
+    def values(config: dict) -> list:
+        """
+        Get the values of a configuration in FIELDS order.
+
+        :param config: Configuration dictionary.
+
+        :return: Configuration values.
+        :rtype: list
+        """
+        return [config[field] for field in FIELDS]
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) or os.path.exists(self.journal_path)
+
+    def load(self):
+        """
+        Load the config file and replay any journaled edits.
+
+        A partially written last journal entry is dropped by folding the journal into the config
+        file, so later edits are not appended after it.
+
+        :raises json.JSONDecodeError: If the config file is corrupted.
+        """
+        self.configs = {}
+        self._next_id = 0
+        self._journaled = 0
+        self._digest = None
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                content = f.read()
+            self._digest = hashlib.sha256(content).hexdigest()
+            for config in json.loads(content):
+                self.configs[self._new_id()] = self.normalize(config)
+        if os.path.exists(self.journal_path):
+            partial = False
+            with open(self.journal_path, 'r') as f:
+                entries = []
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        partial = True
+                        break
+            base = entries[0] if entries else {}
+            if base.get('op') != 'base' or base.get('digest') != self._digest:
+                # The journal was already folded into the config file
+                os.remove(self.journal_path)
+                return
+            if len(base.get('ids', ())) == len(self.configs):
+                self.configs = dict(zip(base['ids'], self.configs.values()))
+                self._next_id = base['next']
+            for entry in entries[1:]:
+                self._apply(entry)
+                self._journaled += 1
+            if partial:
+                self._write()
+
+    def _new_id(self) -> int:
+        config_id = self._next_id
+        self._next_id += 1
+        return config_id
+
+    def _apply(self, entry: dict):
+        if entry['op'] == 'add':
+            self.configs[entry['id']] = self.normalize(entry['config'])
+            self._next_id = max(self._next_id, entry['id'] + 1)
+        elif entry['op'] == 'update':
+            if entry['id'] in self.configs:
+                self.configs[entry['id']] = self.normalize(entry['config'])
+        elif entry['op'] == 'remove':
+            for config_id in entry['ids']:
+                self.configs.pop(config_id, None)
+
+    def _journal(self, entry: dict):
+        with open(self.journal_path, 'a') as f:
+            if not self._journaled:
+                f.write(json.dumps({
+                    'op': 'base',
+                    'digest': self._digest,
+                    'ids': list(self.configs),
+                    'next': self._next_id
+                }) + "\n")
+            f.write(json.dumps(entry) + "\n")
+        self._apply(entry)
+        self._journaled += 1
+        if self._journaled >= self.compact_after:
+            self.save()
+
+    def add(self, config) -> int:
+        """
+        Add a configuration.
+
+        :param config: Configuration dictionary, or list of values in FIELDS order.
+
+        :return: ID of the new configuration.
+        :rtype: int
+        """
+        config_id = self._new_id()
+        self._journal({'op': 'add', 'id': config_id, 'config': self.normalize(config)})
+        return config_id
+
+    def update(self, config_id: int, config) -> bool:
+        """
+        Update a configuration.  Nothing is written when the values did not change.
+
+        :param config_id: Configuration ID.
+        :param config: Configuration dictionary, or list of values in FIELDS order.
+
+        :return: True if the configuration changed.
+        :rtype: bool
+        """
+        config = self.normalize(config)
+        if self.configs.get(config_id) == config:
+            return False
+        self._journal({'op': 'update', 'id': config_id, 'config': config})
+        return True
+
+    def remove(self, config_ids: list) -> bool:
+        """
+        Remove configurations.
+
+        :param config_ids: Configuration IDs.
+
+        :return: True if any configuration was removed.
+        :rtype: bool
+        """
+        config_ids = [config_id for config_id in config_ids if config_id in self.configs]
+        if not config_ids:
+            return False
+        self._journal({'op': 'remove', 'ids': config_ids})
+        return True
+
+    def save(self) -> bool:
+        """
+        Fold journaled edits into the config file.  The file is written to a temporary path and
+        moved into place, and nothing is written when there are no journaled edits.
+
+        :return: True if the config file was written.
+        :rtype: bool
+        """
+        if not self._journaled:
+            return False
+        self._write()
+        return True
+
+    def _write(self):
+        content = json.dumps(list(self.configs.values()), indent=4).encode()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journaled = 0
+        self._digest = hashlib.sha256(content).hexdigest()
@@ -0,0 +1,231 @@
+import os
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from .msm_api import Menus
+from .msm_calendar import Calendar, RenderCache
+
+
+@dataclass
+class MenuSource:
+    district_id: int
+    menu_id: int
+    menu_type: str = "lunch"
+
+
+@dataclass(eq=False)
+class OutputJob:
+    path: str
+    sources: list = field(default_factory=list)
+    date: datetime = None
+
+    def __post_init__(self):
+        # Jobs without a date use the current month
+        if self.date is None:
+            self.date = datetime.now()
+
+
+def cache_key(source: MenuSource, date: datetime) -> tuple:
+    """
+    Get the render cache key of a source's menu for a month.
+
+    :param source: Menu source.
+    :param date: Month of the menu.
+
+    :return: Cache key.
+    :rtype: tuple
+    """
+    return source.district_id, source.menu_id, source.menu_type, date.year, date.month
+
+
+@dataclass
+class Plan:
+    jobs: list
+    consumers: dict
+
+    @property
+    def unique_menus(self) -> int:
+        return len(self.consumers)
+
+
+def plan(jobs: Iterable[OutputJob]) -> Plan:
+    """
+    Group jobs by the unique menus and months they need, so each menu is fetched and rendered once
+    and fanned out to every job that uses it.
+
+    Duplicate sources within a job are dropped, and jobs sharing menus are ordered next to each
+    other so cached menus can be released soon after their last job is written.
+
+    :param jobs: Output jobs.
+
+    :return: Plan with the ordered jobs and the number of jobs using each cache key.
+    :rtype: Plan
+    """
+    planned = []
+    consumers = {}
+    for job in jobs:
+        sources = {}
+        for source in job.sources:
+            sources.setdefault(cache_key(source, job.date), source)
+        job.sources = list(sources.values())
+        for key in sources:
+            consumers[key] = consumers.get(key, 0) + 1
+        planned.append((sorted(sources), job))
+    planned.sort(key=lambda item: item[0])
+    return Plan(jobs=[job for _, job in planned], consumers=consumers)
+
+
+def fetch(jobs: Iterable[OutputJob], menus: Menus, cache: RenderCache = None) -> Iterator[tuple]:
+    """
+    Pair each job with a lazy iterator of its fetched menus.  A menu is only requested when the
+    iterator is advanced, so nothing is fetched ahead of the stage consuming it.
+
+    :param jobs: Output jobs.
+    :param menus: Menus API client.
+    :param cache: Optional render cache.  Menus already rendered into it are not fetched again and
+        are paired with None.
+
+    :return: Iterator of (job, iterator of (source, menu)).
+    :rtype: Iterator[tuple]
+    """
+    for job in jobs:
+        yield job, _fetch_sources(job, menus, cache)
+
+
+def _fetch_sources(job: OutputJob, menus: Menus, cache: RenderCache) -> Iterator[tuple]:
+    for source in job.sources:
+        if cache is not None and cache_key(source, job.date) in cache:
+            yield source, None
+        else:
+            yield source, menus.get(district_id=source.district_id, menu_id=source.menu_id, date=job.date)
+
+
+def parse(fetched: Iterable[tuple], calendar: Calendar, include_time: bool = False) -> Iterator[tuple]:
+    """
+    Turn each job's fetched menus into lazy iterators of events.
+
+    :param fetched: Output of fetch().
+    :param calendar: Calendar used to build events.
+    :param include_time: Whether to include time in events.
+
+    :return: Iterator of (job, iterator of (source, iterator of events)).  Sources fetched as None
+        are paired with None.
+    :rtype: Iterator[tuple]
+    """
+    for job, sources in fetched:
+        yield job, (
+            (source, None if menu is None else
+             calendar.iter_events(menu, menu_type=source.menu_type, include_time=include_time))
+            for source, menu in sources
+        )
+
+
+def render(parsed: Iterable[tuple], calendar: Calendar, cache: RenderCache = None) -> Iterator[tuple]:
+    """
+    Turn each job's events into a lazy iterator of iCal chunks.
+
+    :param parsed: Output of parse().
+    :param calendar: Calendar used to render events.
+    :param cache: Optional render cache.  Each source's events are rendered into it once and reused
+        by every later job with the same source and month.
+
+    :return: Iterator of (job, iterator of iCal chunks).
+    :rtype: Iterator[tuple]
+    """
+    for job, sources in parsed:
+        if cache is None:
+            blocks = (calendar.vevent(event) for _, events in sources for event in events)
+        else:
+            blocks = (block for source, events in sources
+                      for block in cache.render(cache_key(source, job.date), events))
+        yield job, calendar.assemble(blocks)
+
+
+def write_file(path: str, chunks: Iterable[str], newline: str = ''):
+    """
+    Write chunks of text to a file atomically.  The chunks are written to a temporary path that is
+    moved into place once complete, so readers never see a truncated file and a failure leaves the
+    previous file untouched.
+
+    :param path: Path of the file.
+    :param chunks: Chunks of text to write.
+    :param newline: Newline translation passed to open() (default: write chunks unchanged).
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', newline=newline) as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write(rendered: Iterable[tuple]) -> Iterator[OutputJob]:
+    """
+    Write each job's iCal chunks to its path as they are produced.
+
+    The file is written to a temporary path and moved into place once complete, so a failed
+    fetch never leaves a truncated calendar behind.
+
+    :param rendered: Output of render().
+
+    :return: Iterator of written jobs.
+    :rtype: Iterator[OutputJob]
+    """
+    for job, chunks in rendered:
+        write_file(job.path, chunks)
+        yield job
+
+
+def run(jobs: Iterable[OutputJob], calendar: Calendar = None, menus: Menus = None,
+        include_time: bool = False, cache: RenderCache = None) -> Iterator[OutputJob]:
+    """
+    Chain fetch, parse, render and write for each job.
+
+    Stages are generators, so each job is fetched only once the previous job has been written and
+    its menus and events are released before the next job starts.
+
+    :param jobs: Output jobs.
+    :param calendar: Calendar used to build and render events (default: Calendar()).
+    :param menus: Menus API client (default: Menus()).
+    :param include_time: Whether to include time in events.
+    :param cache: Optional render cache shared by jobs with the same sources.  It must only be used
+        with a single calendar and include_time setting.
+
+    :return: Iterator of written jobs.
+    :rtype: Iterator[OutputJob]
+    """
+    calendar = calendar or Calendar()
+    menus = menus or Menus()
+    return write(render(parse(fetch(jobs, menus, cache), calendar, include_time=include_time), calendar, cache))
+
+
+def run_plan(planned: Plan, calendar: Calendar = None, menus: Menus = None,
+             include_time: bool = False) -> Iterator[OutputJob]:
+    """
+    Run a plan, fetching and rendering each unique menu once.  Only menus used by more than one
+    job are cached, and they are released as soon as the last job using them has been written;
+    the others are streamed straight to their file.
+
+    :param planned: Output of plan().
+    :param calendar: Calendar used to build and render events (default: Calendar()).
+    :param menus: Menus API client (default: Menus()).
+    :param include_time: Whether to include time in events.
+
+    :return: Iterator of written jobs.
+    :rtype: Iterator[OutputJob]
+    """
+    calendar = calendar or Calendar()
+    remaining = dict(planned.consumers)
+    cache = RenderCache(calendar, keep={key for key, count in remaining.items() if count > 1})
+    for job in run(planned.jobs, calendar=calendar, menus=menus, include_time=include_time, cache=cache):
+        for source in job.sources:
+            key = cache_key(source, job.date)
+            remaining[key] -= 1
+            if not remaining[key]:
+                cache.release(key)
+        yield job
@@ -0,0 +1,124 @@
+import os
+import time
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+
+@dataclass
+class StageStats:
+    name: str
+    calls: int = 0
+    wall: float = 0.0
+    cpu: float = 0.0
+    peak_memory: int = 0
+    profile: cProfile.Profile = field(default=None, repr=False)
+
+
+class Profiler:
+    def __init__(self, trace_memory: bool = True, profile_dir: str = None):
+        """
+        Initialize a profiler that records wall time, CPU time and peak memory per stage.
+
+        Stages may be nested; time spent in a nested stage is only counted for that stage.
+
+        :param trace_memory: Whether to record peak memory with tracemalloc.
+        :param profile_dir: Directory for per-stage cProfile dumps, or None to disable cProfile.
+        """
+        self.trace_memory = trace_memory
+        self.profile_dir = profile_dir
+        self.stages = {}
+        self._stack = []
+        self._started_tracemalloc = False
+
+    def start(self):
+        """
+        Start tracing memory allocations if requested.
+        """
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def stop(self):
+        """
+        Stop tracing memory allocations and write the cProfile dumps.
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+        if self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            for stats in self.stages.values():
+                if stats.profile is not None:
+                    stats.profile.dump_stats(os.path.join(self.profile_dir, f"{stats.name}.prof"))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _pause(self, stats: StageStats, wall: float, cpu: float):
+        stats.wall += time.perf_counter() - wall
+        stats.cpu += time.process_time() - cpu
+        if stats.profile is not None:
+            stats.profile.disable()
+        if tracemalloc.is_tracing():
+            stats.peak_memory = max(stats.peak_memory, tracemalloc.get_traced_memory()[1])
+
+    def _resume(self, stats: StageStats) -> tuple:
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        if stats.profile is not None:
+            stats.profile.enable()
+        return time.perf_counter(), time.process_time()
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Record the time and memory spent in a stage.
+
+        :param name: Stage name.
+        """
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats(
+                name=name,
+                profile=cProfile.Profile() if self.profile_dir else None
+            )
+        if self._stack:
+            parent = self._stack[-1]
+            self._pause(parent[0], parent[1], parent[2])
+        frame = [stats, *self._resume(stats)]
+        self._stack.append(frame)
+        try:
+            yield stats
+        finally:
+            self._stack.pop()
+            self._pause(stats, frame[1], frame[2])
+            stats.calls += 1
+            if self._stack:
+                parent = self._stack[-1]
+                parent[1], parent[2] = self._resume(parent[0])
+
+    def summary(self) -> str:
+        """
+        Get a table of the recorded stages.
+
+        :return: Summary table.
+        :rtype: str
+        """
+        lines = [f"{'Stage':<12} {'Calls':>8} {'Wall (s)':>10} {'CPU (s)':>10} {'Peak (KiB)':>11}"]
+        for stats in self.stages.values():
+            lines.append(
+                f"{stats.name:<12} {stats.calls:>8} {stats.wall:>10.4f} {stats.cpu:>10.4f} "
+                f"{stats.peak_memory / 1024:>11.1f}"
+            )
+        lines.append(
+            f"{'total':<12} {'':>8} {sum(s.wall for s in self.stages.values()):>10.4f} "
+            f"{sum(s.cpu for s in self.stages.values()):>10.4f} "
+            f"{max((s.peak_memory for s in self.stages.values()), default=0) / 1024:>11.1f}"
+        )
+        return "\n".join(lines)
@@ -1,13 +1,17 @@
 import tkinter as tk
 from tkinter import ttk
 import json
-import os
 from datetime import time, datetime
 
 from .msm_api import Menus
 from .msm_calendar import Calendar as MSMCalendar
+from .msm_config import CONFIG_FILE, FIELDS, ConfigStore
+from .msm_pipeline import MenuSource, OutputJob, plan, run_plan
 
-CONFIG_FILE = 'config.json'
+# Rows inserted into the Treeview per idle callback while loading
+BATCH_SIZE = 200
+# Rows shown at once; "Show more" reveals the next page of matches
+PAGE_SIZE = 1000
 
 class ConfigDialog(tk.Toplevel):
     def __init__(self, parent, title=None, config=None):
@@ -61,17 +65,31 @@ class Application(tk.Frame):
     def __init__(self, master=None):
         super().__init__(master)
         self.master = master
+        self.store = ConfigStore(CONFIG_FILE)
+        self.matches = []
+        self.shown = 0
+        self.target = 0
+        self._pending_batch = None
+        self._pending_filter = None
         self.pack(fill="both", expand=True)
         self.create_widgets()
+        self.master.protocol("WM_DELETE_WINDOW", self.close)
         self.load_config()
 
     def create_widgets(self):
+        # Filter
+        self.filter_frame = tk.Frame(self)
+        self.filter_frame.pack(side="top", fill="x")
+        tk.Label(self.filter_frame, text="Filter:").pack(side="left")
+        self.filter_text = tk.StringVar()
+        self.filter_text.trace_add("write", self.schedule_filter)
+        self.filter_entry = tk.Entry(self.filter_frame, textvariable=self.filter_text)
+        self.filter_entry.pack(side="left", fill="x", expand=True)
+
         # School/Menu Configuration List
-        self.tree = ttk.Treeview(self, columns=('District ID', 'Site ID', 'Lunch Menu ID', 'Breakfast Menu ID'), show='headings')
-        self.tree.heading('District ID', text='District ID')
-        self.tree.heading('Site ID', text='Site ID')
-        self.tree.heading('Lunch Menu ID', text='Lunch Menu ID')
-        self.tree.heading('Breakfast Menu ID', text='Breakfast Menu ID')
+        self.tree = ttk.Treeview(self, columns=FIELDS, show='headings')
+        for field in FIELDS:
+            self.tree.heading(field, text=field)
         self.tree.pack(side="top", fill="both", expand=True)
 
         # Buttons
@@ -87,6 +105,9 @@ class Application(tk.Frame):
         self.remove_button = tk.Button(self.button_frame, text="Remove", command=self.remove_config)
         self.remove_button.pack(side="left")
 
+        self.more_button = tk.Button(self.button_frame, text="Show more", command=self.show_more)
+        self.more_button.pack(side="left")
+
         # ICS Generation
         self.generate_frame = tk.Frame(self)
         self.generate_frame.pack(side="top", fill="x")
@@ -103,57 +124,106 @@ class Application(tk.Frame):
         self.status.pack(side="bottom", fill="x")
 
         self.quit = tk.Button(self, text="QUIT", fg="red",
-                              command=self.master.destroy)
+                              command=self.close)
         self.quit.pack(side="bottom")
 
     def load_config(self):
-        if os.path.exists(CONFIG_FILE):
-            with open(CONFIG_FILE, 'r') as f:
-                try:
-                    configs = json.load(f)
-                    for config in configs:
-                        self.tree.insert('', 'end', values=list(config.values()))
-                except json.JSONDecodeError:
-                    self.status.config(text="Error: config.json is corrupted.")
-        else:
+        if not self.store.exists():
             self.status.config(text="No config.json found. Please add a configuration.")
+            return
+        try:
+            self.store.load()
+        except json.JSONDecodeError:
+            self.status.config(text="Error: config.json is corrupted.")
+            return
+        self.refresh_view()
 
     def save_config(self):
-        configs = []
-        for child in self.tree.get_children():
-            values = self.tree.item(child)['values']
-            configs.append({
-                'District ID': values[0],
-                'Site ID': values[1],
-                'Lunch Menu ID': values[2],
-                'Breakfast Menu ID': values[3]
-            })
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(configs, f, indent=4)
+        self.store.save()
+
+    def close(self):
+        self.save_config()
+        self.master.destroy()
+
+    def schedule_filter(self, *args):
+        # Wait for a pause in typing before filtering
+        if self._pending_filter is not None:
+            self.after_cancel(self._pending_filter)
+        self._pending_filter = self.after(200, self.refresh_view)
+
+    def refresh_view(self):
+        """
+        Show the configurations matching the filter, inserting rows in batches so the window
+        stays responsive.
+        """
+        self._pending_filter = None
+        if self._pending_batch is not None:
+            self.after_cancel(self._pending_batch)
+            self._pending_batch = None
+        self.tree.delete(*self.tree.get_children())
+        text = self.filter_text.get().strip().lower()
+        self.matches = [config_id for config_id, config in self.store if self._matches(config, text)]
+        self.shown = 0
+        self.target = 0
+        self.show_more()
+
+    @staticmethod
+    def _matches(config: dict, text: str) -> bool:
+        return not text or any(text in value.lower() for value in config.values())
+
+    def show_more(self):
+        self.target = min(len(self.matches), self.target + PAGE_SIZE)
+        if self._pending_batch is None:
+            self._insert_batch()
+
+    def _insert_batch(self):
+        self._pending_batch = None
+        start = self.shown
+        self.shown = min(self.target, start + BATCH_SIZE)
+        for config_id in self.matches[start:self.shown]:
+            self.tree.insert('', 'end', iid=str(config_id), values=ConfigStore.values(self.store.configs[config_id]))
+        if self.shown < self.target:
+            self._pending_batch = self.after(1, self._insert_batch)
+        self.update_status()
+
+    def update_status(self):
+        self.status.config(text=f"Showing {self.shown} of {len(self.matches)} matching configurations "
+                                f"({len(self.store)} total).")
 
     def add_config(self):
         dialog = ConfigDialog(self, "Add Configuration")
         if dialog.result:
-            self.tree.insert('', 'end', values=dialog.result)
-            self.save_config()
+            config_id = self.store.add(dialog.result)
+            # List the new configuration only if it matches the current filter
+            if self._matches(self.store.configs[config_id], self.filter_text.get().strip().lower()):
+                self.matches.append(config_id)
+                # Show the new row right away unless earlier matches are still waiting to be shown
+                if self.shown == len(self.matches) - 1:
+                    self.tree.insert('', 'end', iid=str(config_id), values=ConfigStore.values(self.store.configs[config_id]))
+                    self.shown += 1
+                    self.target = max(self.target, self.shown)
+            self.update_status()
 
     def edit_config(self):
         selected_item = self.tree.selection()
         if not selected_item:
             return
-        item = self.tree.item(selected_item[0])
-        dialog = ConfigDialog(self, "Edit Configuration", item['values'])
-        if dialog.result:
-            self.tree.item(selected_item[0], values=dialog.result)
-            self.save_config()
+        config_id = int(selected_item[0])
+        dialog = ConfigDialog(self, "Edit Configuration", ConfigStore.values(self.store.configs[config_id]))
+        if dialog.result and self.store.update(config_id, dialog.result):
+            self.tree.item(selected_item[0], values=ConfigStore.values(self.store.configs[config_id]))
 
     def remove_config(self):
         selected_item = self.tree.selection()
         if not selected_item:
             return
-        for item in selected_item:
-            self.tree.delete(item)
-        self.save_config()
+        removed = {int(item) for item in selected_item}
+        if self.store.remove(list(removed)):
+            self.tree.delete(*selected_item)
+            self.matches = [config_id for config_id in self.matches if config_id not in removed]
+            self.shown -= len(selected_item)
+            self.target -= len(selected_item)
+            self.update_status()
 
     def generate_ics(self):
         self.status.config(text="Generating ICS files...")
@@ -165,43 +235,46 @@ class Application(tk.Frame):
             default_lunch_time=time(12, 0)
         )
 
-        all_events = []
-
-        for i, child in enumerate(self.tree.get_children()):
-            config = self.tree.item(child)['values']
-            district_id = int(config[0])
-            site_id = int(config[1])
-            lunch_menu_id = int(config[2]) if config[2] else None
-            breakfast_menu_id = int(config[3]) if config[3] else None
+        date = datetime.now()
+        combine = self.combine_ics.get()
+        jobs = []
+        all_sources = []
 
-            school_events = []
+        try:
+            for _, config in self.store:
+                config = ConfigStore.values(config)
+                district_id = int(config[0])
+                site_id = int(config[1])
+                lunch_menu_id = int(config[2]) if config[2] else None
+                breakfast_menu_id = int(config[3]) if config[3] else None
 
-            try:
+                sources = []
                 if lunch_menu_id:
-                    lunch_menu = menus.get(district_id=district_id, menu_id=lunch_menu_id, date=datetime.now())
-                    school_events.extend(cal.events(lunch_menu, menu_type="lunch", include_time=True))
+                    sources.append(MenuSource(district_id=district_id, menu_id=lunch_menu_id, menu_type="lunch"))
                 if breakfast_menu_id:
-                    breakfast_menu = menus.get(district_id=district_id, menu_id=breakfast_menu_id, date=datetime.now())
-                    school_events.extend(cal.events(breakfast_menu, menu_type="breakfast", include_time=True))
-
-                if not self.combine_ics.get():
-                    ical = cal.ical(school_events)
-                    with open(f'school-{district_id}-{site_id}-menu-calendar.ics', 'w', newline='') as f:
-                        f.write(ical)
-
-                all_events.extend(school_events)
-            except Exception as e:
-                self.status.config(text=f"Error: {e}")
-                return
-
-        if self.combine_ics.get():
-            ical = cal.ical(all_events)
-            with open('school-menu-calendar.ics', 'w', newline='') as f:
-                f.write(ical)
-            self.status.config(text="Combined ICS file generated.")
-        else:
-            self.status.config(text="Individual ICS files generated.")
+                    sources.append(MenuSource(district_id=district_id, menu_id=breakfast_menu_id, menu_type="breakfast"))
+
+                if combine:
+                    all_sources.extend(sources)
+                else:
+                    jobs.append(OutputJob(path=f'school-{district_id}-{site_id}-menu-calendar.ics', sources=sources, date=date))
+
+            if combine:
+                jobs = [OutputJob(path='school-menu-calendar.ics', sources=all_sources, date=date)]
+
+            # Menus shared by several schools are fetched and rendered once, and each file is
+            # written before the next one is fetched
+            planned = plan(jobs)
+            for _ in run_plan(planned, calendar=cal, menus=menus, include_time=True):
+                pass
+        except Exception as e:
+            self.status.config(text=f"Error: {e}")
+            return
 
+        if combine:
+            self.status.config(text=f"Combined ICS file generated from {planned.unique_menus} unique menus.")
+        else:
+            self.status.config(text=f"{len(planned.jobs)} individual ICS files generated from {planned.unique_menus} unique menus.")
 
 if __name__ == "__main__":
     root = tk.Tk()
@@ -0,0 +1,267 @@
+import time
+import hashlib
+from datetime import datetime
+from dataclasses import dataclass
+
+from .msm_api import Menus
+
+
+@dataclass(frozen=True)
+class WatchTarget:
+    district_id: int
+    menu_id: int
+    menu_type: str = "lunch"
+
+
+@dataclass
+class MonthState:
+    month: datetime
+    interval: float = None
+    next_poll: float = 0.0
+    digest: str = None
+    polls: int = 0
+    changes: int = 0
+
+
+class Watcher:
+    def __init__(self, targets: list, on_change, menus: Menus = None,
+                 min_interval: float = 15 * 60, max_interval: float = 24 * 60 * 60,
+                 past_interval: float = None, months_interval: float = 24 * 60 * 60,
+                 backoff: float = 2.0, clock=time.monotonic, sleep=time.sleep):
+        """
+        Initialize a watcher that polls menus and reports months whose content changed.
+
+        Current and upcoming months start at min_interval.  Each poll without a change
+        multiplies the month's interval by backoff (up to max_interval), and each change
+        resets it to min_interval.  Past months are polled every past_interval, or never
+        again after their first poll when past_interval is None.
+
+        :param targets: List of WatchTarget to poll.
+        :param on_change: Callable invoked as on_change(target, month, menu) for each changed month.
+        :param menus: Menus API client (default: Menus()).
+        :param min_interval: Shortest poll interval in seconds.
+        :param max_interval: Longest poll interval in seconds.
+        :param past_interval: Poll interval in seconds for past months, or None to stop polling them.
+        :param months_interval: Interval in seconds between refreshes of each menu's published months.
+        :param backoff: Interval multiplier applied after a poll without changes.
+        :param clock: Monotonic clock function.
+        :param sleep: Sleep function.
+        """
+        self.targets = list(targets)
+        self.on_change = on_change
+        self.menus = menus or Menus()
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.past_interval = past_interval
+        self.months_interval = months_interval
+        self.backoff = backoff
+        self.clock = clock
+        self.sleep = sleep
+        self.requests = 0
+        self._months = {target: {} for target in self.targets}
+        self._next_months_refresh = {target: 0.0 for target in self.targets}
+        self._refreshed = set()
+
+    @staticmethod
+    def digest(menu: dict) -> str:
+        """
+        Get a digest of the menu content that affects calendar events.
+
+        :param menu: date_overwrites menu.
+
+        :return: Hex digest of the menu days and settings.
+        :rtype: str
+        """
+        sha = hashlib.sha256()
+        for entry in menu['data'] or []:
+            if entry is None:
+                continue
+            sha.update(str(entry.get('day')).encode())
+            sha.update(b'\0')
+            sha.update(str(entry.get('setting')).encode())
+            sha.update(b'\0')
+        return sha.hexdigest()
+
+    @staticmethod
+    def is_past(month: datetime, today: datetime = None) -> bool:
+        """
+        Check whether a month ended before today.
+
+        :param month: First day of the month.
+        :param today: Reference date (default: now).
+
+        :return: True if the month is in the past.
+        :rtype: bool
+        """
+        today = today or datetime.now()
+        return (month.year, month.month) < (today.year, today.month)
+
+    def states(self, target: WatchTarget) -> dict:
+        """
+        Get the poll state of each known month for a target.
+
+        :param target: Watch target.
+
+        :return: Month states keyed by (year, month).
+        :rtype: dict
+        """
+        return self._months[target]
+
+    def is_polled(self, key: tuple) -> bool:
+        """
+        Check whether every target has polled a month successfully.  Targets whose published
+        months were refreshed without the month are skipped.
+
+        :param key: Month as (year, month).
+
+        :return: True if no target is still waiting for a first successful poll of the month.
+        :rtype: bool
+        """
+        for target in self.targets:
+            state = self._months[target].get(key)
+            if state is None:
+                if target not in self._refreshed:
+                    return False
+            elif state.digest is None:
+                return False
+        return True
+
+    def is_finished(self, key: tuple) -> bool:
+        """
+        Check whether no target will poll a month again.
+
+        :param key: Month as (year, month).
+
+        :return: True if the month has been polled for the last time.
+        :rtype: bool
+        """
+        return self.is_polled(key) and all(
+            self._months[target][key].next_poll is None
+            for target in self.targets if key in self._months[target]
+        )
+
+    def refresh_months(self, target: WatchTarget, now: float):
+        """
+        Refresh the published months of a target's menu.
+
+        :param target: Watch target.
+        :param now: Current clock value.
+        """
+        menu = self.menus.get(district_id=target.district_id, menu_id=target.menu_id)
+        self.requests += 1
+        self._next_months_refresh[target] = now + self.months_interval
+        self._refreshed.add(target)
+        states = self._months[target]
+        for month in Menus.menu_months(menu):
+            key = (month.year, month.month)
+            if key not in states:
+                states[key] = MonthState(month=month, next_poll=now)
+
+    def _reschedule(self, state: MonthState, changed: bool, now: float):
+        if self.is_past(state.month):
+            if self.past_interval is None:
+                state.next_poll = None
+                return
+            state.interval = self.past_interval
+        elif changed or state.interval is None:
+            state.interval = self.min_interval
+        else:
+            state.interval = min(self.max_interval, state.interval * self.backoff)
+        state.next_poll = now + state.interval
+
+    def poll(self, target: WatchTarget, state: MonthState, now: float) -> bool:
+        """
+        Poll a single month and report it when its content changed.
+
+        :param target: Watch target.
+        :param state: Month state.
+        :param now: Current clock value.
+
+        :return: True if the month's content changed since the last poll.
+        :rtype: bool
+        """
+        menu = self.menus.get(district_id=target.district_id, menu_id=target.menu_id, date=state.month)
+        self.requests += 1
+        state.polls += 1
+        digest = self.digest(menu)
+        changed = digest != state.digest
+        first_poll = state.digest is None
+        state.digest = digest
+        if changed:
+            if not first_poll:
+                state.changes += 1
+            self.on_change(target, state.month, menu)
+        self._reschedule(state, changed and not first_poll, now)
+        return changed
+
+    def _backoff(self, state: MonthState, now: float):
+        state.interval = min(self.max_interval, (state.interval or self.min_interval) * self.backoff)
+        state.next_poll = now + state.interval
+
+    def poll_due(self, on_error=None) -> int:
+        """
+        Poll every month whose next poll time has passed.
+
+        A failing months refresh or month poll does not stop the others.  The failing refresh is
+        retried after min_interval, and the failing month backs off its own interval.
+
+        :param on_error: Callable invoked with each exception raised by a refresh or poll.  When not
+            provided the first exception is raised once every due month has been polled.
+
+        :return: Number of months that changed.
+        :rtype: int
+        """
+        changed = 0
+        errors = []
+        for target in self.targets:
+            now = self.clock()
+            if now >= self._next_months_refresh[target]:
+                try:
+                    self.refresh_months(target, now)
+                except Exception as e:
+                    self._next_months_refresh[target] = now + self.min_interval
+                    errors.append(e)
+                    if on_error is not None:
+                        on_error(e)
+            for state in self._months[target].values():
+                if state.next_poll is not None and now >= state.next_poll:
+                    try:
+                        changed += self.poll(target, state, now)
+                    except Exception as e:
+                        self._backoff(state, now)
+                        errors.append(e)
+                        if on_error is not None:
+                            on_error(e)
+        if errors and on_error is None:
+            raise errors[0]
+        return changed
+
+    def next_due(self) -> float:
+        """
+        Get the clock value of the next scheduled poll or months refresh.
+
+        :return: Clock value of the next poll, or None if there are no targets.
+        :rtype: float
+        """
+        due = list(self._next_months_refresh.values())
+        for states in self._months.values():
+            due.extend(state.next_poll for state in states.values() if state.next_poll is not None)
+        return min(due, default=None)
+
+    def run(self, stop=None, on_error=None, on_cycle=None):
+        """
+        Poll until stop() returns True.  Returns immediately when there are no targets.
+
+        :param stop: Callable checked before each cycle (default: run forever).
+        :param on_error: Callable invoked with each exception raised by a refresh or poll.  When not
+            provided the exception propagates after the cycle.
+        :param on_cycle: Callable invoked after each cycle, once every due month of every target
+            has been polled.
+        """
+        if not self.targets:
+            return
+        while not (stop and stop()):
+            self.poll_due(on_error)
+            if on_cycle is not None:
+                on_cycle()
+            self.sleep(max(0.0, self.next_due() - self.clock()))
@@ -1,5 +1,8 @@
+import time
 import pytest
-from my_school_menus.msm_api import Menus
+import threading
+import requests
+from my_school_menus.msm_api import Menus, Request, RetryPolicy, CircuitBreaker, CircuitOpenError
 from unittest import mock
 
 
@@ -24,6 +27,18 @@ def mocked_requests_menus_get_successful(*args, **kwargs):
                                  "message":None}, 200)
 #
 
+@pytest.fixture(autouse=True)
+def reset_request_state():
+    Request._breakers.clear()
+    Request._latencies.clear()
+    yield
+    Request._breakers.clear()
+    Request._latencies.clear()
+    if Request._executor is not None:
+        Request._executor.shutdown(wait=True)
+        Request._executor = None
+
+
 @mock.patch('requests.get', side_effect=mocked_requests_menus_get_no_records_found)
 def test_get_menu_non_existent_ids(mock_get):
     with pytest.raises(ValueError):
@@ -34,3 +49,123 @@ def test_get_menu_non_existent_ids(mock_get):
 def test_get_menu_successful_ids(mock_get):
     menu_info = Menus().get(1337, 12345)
     assert menu_info['data']['id'] == 12345
+
+
+class MockErrorResponse(MockResponse):
+    reason = 'Service Unavailable'
+
+
+@mock.patch('my_school_menus.msm_api.time.sleep')
+def test_get_menu_retries_unavailable(mock_sleep):
+    responses = [MockErrorResponse({}, 503), requests.exceptions.ConnectionError(), mocked_requests_menus_get_successful()]
+
+    def side_effect(*args, **kwargs):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    with mock.patch('requests.get', side_effect=side_effect) as mock_get:
+        menu_info = Menus().get(1337, 12345)
+    assert menu_info['data']['id'] == 12345
+    assert mock_get.call_count == 3
+    assert mock_sleep.call_count == 2
+    assert mock_get.call_args.kwargs['timeout'] > 0
+
+
+@mock.patch('my_school_menus.msm_api.time.sleep')
+@mock.patch('requests.get', return_value=MockErrorResponse({}, 503))
+def test_get_menu_gives_up_after_retries(mock_get, mock_sleep):
+    with pytest.raises(ValueError):
+        Menus().get(1337, 12345)
+    assert mock_get.call_count == Request.policy.retries + 1
+
+
+@mock.patch('my_school_menus.msm_api.time.sleep')
+@mock.patch('requests.get', return_value=MockErrorResponse({}, 503))
+def test_get_menu_circuit_opens(mock_get, mock_sleep):
+    for _ in range(Request.policy.breaker_threshold):
+        with pytest.raises(ValueError):
+            Menus().get(1337, 12345)
+    with pytest.raises(CircuitOpenError):
+        Menus().get(1337, 54321)
+    assert mock_get.call_count == Request.policy.breaker_threshold * (Request.policy.retries + 1)
+
+
+@mock.patch('my_school_menus.msm_api.time.sleep')
+@mock.patch('requests.get', return_value=MockErrorResponse({}, 503))
+def test_retries_count_as_one_failure(mock_get, mock_sleep):
+    with pytest.raises(ValueError):
+        Menus().get(1337, 12345)
+    [breaker] = Request._breakers.values()
+    assert breaker.failures == 1
+
+
+@mock.patch('my_school_menus.msm_api.time.sleep')
+def test_broken_menu_does_not_open_circuit(mock_sleep):
+    with mock.patch('requests.get', return_value=MockErrorResponse({}, 500)):
+        for _ in range(Request.policy.breaker_threshold):
+            with pytest.raises(ValueError):
+                Menus().get(1337, 12345)
+    with mock.patch('requests.get', side_effect=mocked_requests_menus_get_successful):
+        assert Menus().get(1337, 54321)['data']
+
+
+def test_circuit_breaker_half_open():
+    now = [0.0]
+    breaker = CircuitBreaker(threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.allow()
+    now[0] = 10
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow()
+
+
+def test_hedged_request_returns_first_response():
+    policy = RetryPolicy(hedge_percentile=50, hedge_min_samples=1)
+    Request._record_latency('hedge', 0.01)
+    calls = []
+
+    def side_effect(*args, **kwargs):
+        calls.append(None)
+        if len(calls) == 1:
+            time.sleep(0.5)
+        return mocked_requests_menus_get_successful()
+
+    with mock.patch('requests.get', side_effect=side_effect):
+        response = Request.fetch('https://example.com', endpoint='hedge', policy=policy)
+    assert response.status_code == 200
+    assert len(calls) == 2
+
+
+@mock.patch('my_school_menus.msm_api.time.sleep')
+def test_failed_trial_request_reopens_circuit(mock_sleep):
+    policy = RetryPolicy(retries=0, breaker_threshold=1, breaker_reset=0)
+    with mock.patch('requests.get', side_effect=requests.exceptions.ChunkedEncodingError()):
+        with pytest.raises(requests.exceptions.ChunkedEncodingError):
+            Request.fetch('https://example.com', endpoint='trial', policy=policy)
+    breaker = Request._breakers['trial']
+    assert breaker.opened_at is not None
+    with mock.patch('requests.get', side_effect=mocked_requests_menus_get_successful):
+        assert Request.fetch('https://example.com', endpoint='trial', policy=policy).status_code == 200
+    assert breaker.opened_at is None
+
+
+@mock.patch('my_school_menus.msm_api.time.sleep')
+def test_hedged_request_respects_deadline(mock_sleep):
+    policy = RetryPolicy(timeout=5, deadline=0.2, hedge_percentile=50, hedge_min_samples=1)
+    Request._record_latency('slow', 0.01)
+
+    def side_effect(*args, **kwargs):
+        # time.sleep is patched for the retry backoff
+        threading.Event().wait(0.5)
+        return mocked_requests_menus_get_successful()
+
+    start = time.monotonic()
+    with mock.patch('requests.get', side_effect=side_effect):
+        with pytest.raises(ValueError):
+            Request.fetch('https://example.com', endpoint='slow', policy=policy)
+    assert time.monotonic() - start < 0.4
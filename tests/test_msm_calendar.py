@@ -1,5 +1,5 @@
 import pytest
-from my_school_menus.msm_calendar import Calendar
+from my_school_menus.msm_calendar import Calendar, RenderCache
 
 
 def menu_data():
@@ -23,3 +23,35 @@ def test_ical():
     cal = Calendar()
     event_data = cal.events(menu_data())
     cal.ical(event_data)
+
+
+def test_iter_events_missing_menu_data():
+    cal = Calendar()
+    with pytest.raises(ValueError):
+        cal.iter_events({'data': []})
+
+
+def test_iter_ical_matches_ical():
+    cal = Calendar()
+    event_data = cal.events(menu_data(), include_time=True)
+    assert ''.join(cal.iter_ical(iter(event_data))) == cal.ical(event_data)
+
+
+def test_render_cache_matches_ical():
+    cal = Calendar()
+    lunch = cal.events(menu_data())
+    breakfast = cal.events(menu_data(), menu_type="breakfast")
+    cache = RenderCache(cal)
+    cache.render("lunch", lunch)
+    cache.render("breakfast", breakfast)
+    assert cache.ical("lunch") == cal.ical(lunch)
+    assert cache.ical("lunch", "breakfast") == cal.ical(lunch + breakfast)
+
+
+def test_render_cache_renders_once():
+    cal = Calendar()
+    cache = RenderCache(cal)
+    blocks = cache.render("lunch", cal.events(menu_data()))
+    assert cache.render("lunch", iter(())) is blocks
+    cache.release("lunch")
+    assert "lunch" not in cache
@@ -0,0 +1,108 @@
+import json
+import pytest
+from my_school_menus.msm_config import ConfigStore
+
+
+def write_config(path, configs):
+    with open(path, 'w') as f:
+        json.dump(configs, f, indent=4)
+
+
+def config(site_id):
+    return {'District ID': 1, 'Site ID': site_id, 'Lunch Menu ID': 10, 'Breakfast Menu ID': ''}
+
+
+def test_load_missing_config(tmp_path):
+    store = ConfigStore(str(tmp_path / 'config.json'))
+    assert not store.exists()
+    store.load()
+    assert len(store) == 0
+
+
+def test_load_corrupted_config(tmp_path):
+    path = tmp_path / 'config.json'
+    path.write_text('[{')
+    with pytest.raises(json.JSONDecodeError):
+        ConfigStore(str(path)).load()
+
+
+def test_edits_are_journaled_until_save(tmp_path):
+    path = tmp_path / 'config.json'
+    write_config(path, [config(1), config(2)])
+    original = path.read_text()
+    store = ConfigStore(str(path))
+    store.load()
+    new_id = store.add(config(3))
+    assert store.update(0, config(4))
+    assert not store.update(0, config(4))
+    assert store.remove([1])
+    assert path.read_text() == original
+
+    reloaded = ConfigStore(str(path))
+    reloaded.load()
+    assert [c['Site ID'] for _, c in reloaded] == ['4', '3']
+    assert new_id in reloaded.configs
+
+    assert store.save()
+    assert not store.save()
+    assert json.loads(path.read_text()) == [ConfigStore.normalize(config(4)), ConfigStore.normalize(config(3))]
+    assert not (tmp_path / 'config.json.journal').exists()
+
+
+def test_compacts_after_limit(tmp_path):
+    path = tmp_path / 'config.json'
+    store = ConfigStore(str(path), compact_after=3)
+    store.load()
+    for site_id in range(3):
+        store.add(config(site_id))
+    assert len(json.loads(path.read_text())) == 3
+    assert not (tmp_path / 'config.json.journal').exists()
+
+
+def test_stale_and_partial_journal(tmp_path):
+    path = tmp_path / 'config.json'
+    write_config(path, [config(1)])
+    store = ConfigStore(str(path))
+    store.load()
+    store.add(config(2))
+    journal = tmp_path / 'config.json.journal'
+    with open(journal, 'a') as f:
+        f.write('{"op": "add", "id"')
+
+    reloaded = ConfigStore(str(path))
+    reloaded.load()
+    assert len(reloaded) == 2
+    assert not journal.exists()
+
+    # A journal left behind after its edits were folded into the config file is ignored
+    journal.write_text(json.dumps({'op': 'base', 'digest': 'stale'}) + '\n' +
+                       json.dumps({'op': 'remove', 'ids': [0]}) + '\n')
+    reloaded.load()
+    assert len(reloaded) == 2
+
+
+def test_unchanged_edit_of_int_config_is_not_written(tmp_path):
+    path = tmp_path / 'config.json'
+    write_config(path, [config(1)])
+    store = ConfigStore(str(path))
+    store.load()
+    assert store.configs[0] == {'District ID': '1', 'Site ID': '1', 'Lunch Menu ID': '10', 'Breakfast Menu ID': ''}
+    assert not store.update(0, ['1', '1', '10', ''])
+    assert not (tmp_path / 'config.json.journal').exists()
+
+
+def test_ids_stable_across_compaction(tmp_path):
+    path = tmp_path / 'config.json'
+    write_config(path, [config(1), config(2), config(3)])
+    store = ConfigStore(str(path), compact_after=2)
+    store.load()
+    store.remove([1])
+    new_id = store.add(config(4))
+    assert new_id == 3
+    assert store.configs[new_id]['Site ID'] == '4'
+    assert sorted(store.configs) == [0, 2, 3]
+
+    store.update(2, config(5))
+    reloaded = ConfigStore(str(path))
+    reloaded.load()
+    assert reloaded.configs == store.configs
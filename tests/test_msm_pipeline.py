@@ -0,0 +1,106 @@
+import pytest
+from datetime import datetime
+from unittest import mock
+from my_school_menus import msm_pipeline
+from my_school_menus.msm_calendar import Calendar, RenderCache
+from my_school_menus.msm_pipeline import MenuSource, OutputJob
+
+
+class FakeMenus:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, district_id, site_id=None, menu_id=None, date=None):
+        self.calls.append(menu_id)
+        if menu_id == 0:
+            raise ValueError(f"No menu found for district {district_id}, menu {menu_id}")
+        return {'data': [
+            {'day': '2022-01-03T00:00:00.000-05:00',
+             'setting': '{"current_display":[{"type":"recipe","name":"Menu %d"}]}' % menu_id}
+        ]}
+
+
+def test_run_writes_each_job(tmp_path):
+    menus = FakeMenus()
+    jobs = [
+        OutputJob(path=str(tmp_path / 'a.ics'), sources=[MenuSource(1, 10), MenuSource(1, 11, 'breakfast')],
+                  date=datetime(2022, 1, 1)),
+        OutputJob(path=str(tmp_path / 'b.ics'), sources=[MenuSource(1, 12)], date=datetime(2022, 1, 1)),
+    ]
+    written = msm_pipeline.run(jobs, menus=menus)
+    assert menus.calls == []
+    assert next(written) is jobs[0]
+    assert menus.calls == [10, 11]
+    assert list(written) == [jobs[1]]
+    text = (tmp_path / 'a.ics').read_text()
+    assert 'SUMMARY:L: Menu 10' in text
+    assert 'SUMMARY:B: Menu 11' in text
+    assert text.endswith('END:VCALENDAR')
+
+
+def test_run_writes_crlf_lines(tmp_path):
+    path = tmp_path / 'a.ics'
+    list(msm_pipeline.run([OutputJob(path=str(path), sources=[MenuSource(1, 10)])], menus=FakeMenus()))
+    with open(path, newline='') as f:
+        text = f.read()
+    assert '\r\n' in text
+    assert text.count('BEGIN:VEVENT') == 1
+
+
+def test_failed_fetch_leaves_no_file(tmp_path):
+    path = tmp_path / 'a.ics'
+    with pytest.raises(ValueError):
+        list(msm_pipeline.run([OutputJob(path=str(path), sources=[MenuSource(1, 10), MenuSource(1, 0)])],
+                              menus=FakeMenus()))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_run_with_cache_fetches_shared_menus_once(tmp_path):
+    menus = FakeMenus()
+    cal = Calendar()
+    date = datetime(2022, 1, 1)
+    jobs = [
+        OutputJob(path=str(tmp_path / 'a.ics'), sources=[MenuSource(1, 10), MenuSource(1, 11, 'breakfast')], date=date),
+        OutputJob(path=str(tmp_path / 'b.ics'), sources=[MenuSource(1, 10)], date=date),
+    ]
+    list(msm_pipeline.run(jobs, calendar=cal, menus=menus, cache=RenderCache(cal)))
+    assert menus.calls == [10, 11]
+    assert (tmp_path / 'a.ics').read_text().count('SUMMARY:L: Menu 10') == 1
+    assert (tmp_path / 'b.ics').read_text().count('SUMMARY:L: Menu 10') == 1
+
+
+def test_plan_groups_shared_menus(tmp_path):
+    menus = FakeMenus()
+    date = datetime(2022, 1, 1)
+    jobs = [
+        OutputJob(path=str(tmp_path / f'{site}.ics'), sources=[MenuSource(1, 10 + site % 2), MenuSource(1, 20, 'breakfast')],
+                  date=date)
+        for site in range(6)
+    ]
+    jobs.append(OutputJob(path=str(tmp_path / 'all.ics'), sources=[MenuSource(1, 10), MenuSource(1, 10)], date=date))
+    planned = msm_pipeline.plan(jobs)
+    assert planned.unique_menus == 3
+    assert planned.consumers[(1, 10, 'lunch', 2022, 1)] == 4
+    assert len(jobs[-1].sources) == 1
+    written = list(msm_pipeline.run_plan(planned, menus=menus))
+    assert len(written) == 7
+    assert sorted(menus.calls) == [10, 11, 20]
+    assert (tmp_path / '5.ics').read_text().count('SUMMARY:L: Menu 11') == 1
+
+
+def test_run_plan_streams_unshared_menus(tmp_path):
+    date = datetime(2022, 1, 1)
+    jobs = [OutputJob(path=str(tmp_path / 'all.ics'), sources=[MenuSource(1, menu_id) for menu_id in range(10, 60)],
+                      date=date)]
+    cached = []
+    original_render = RenderCache.render
+
+    def render(self, key, events):
+        blocks = original_render(self, key, events)
+        cached.append(len(self))
+        return blocks
+
+    with mock.patch.object(RenderCache, 'render', render):
+        list(msm_pipeline.run_plan(msm_pipeline.plan(jobs), menus=FakeMenus()))
+    assert max(cached) == 0
+    assert (tmp_path / 'all.ics').read_text().count('BEGIN:VEVENT') == 50
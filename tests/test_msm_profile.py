@@ -0,0 +1,29 @@
+import os
+from my_school_menus.msm_calendar import Calendar
+from my_school_menus.msm_profile import Profiler
+from tests.test_msm_calendar import menu_data
+
+
+def test_calendar_stages():
+    with Profiler() as profiler:
+        cal = Calendar(profiler=profiler)
+        cal.ical(cal.events(menu_data()))
+    assert list(profiler.stages) == ['parse', 'build', 'render', 'fold']
+    assert all(stats.calls == 1 for stats in profiler.stages.values())
+    assert profiler.stages['render'].peak_memory > 0
+
+
+def test_nested_stage_time_is_exclusive():
+    profiler = Profiler(trace_memory=False)
+    with profiler.stage('outer'):
+        with profiler.stage('inner'):
+            sum(range(100000))
+    assert profiler.stages['inner'].wall > profiler.stages['outer'].wall
+
+
+def test_profile_dumps(tmp_path):
+    with Profiler(trace_memory=False, profile_dir=str(tmp_path)) as profiler:
+        with profiler.stage('write'):
+            pass
+    assert os.path.exists(tmp_path / 'write.prof')
+    assert 'write' in profiler.summary()
@@ -0,0 +1,145 @@
+import pytest
+from datetime import datetime
+from my_school_menus.msm_watch import Watcher, WatchTarget
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FakeMenus:
+    def __init__(self, months, failing=()):
+        self.months = months
+        self.failing = failing
+        self.settings = {}
+        self.calls = []
+
+    def get(self, district_id, site_id=None, menu_id=None, date=None):
+        self.calls.append(date)
+        if date is None:
+            return {'data': {'published_months': [m.isoformat() for m in self.months]}}
+        if menu_id in self.failing:
+            raise ValueError(f"No menu found for district {district_id}, menu {menu_id}, and date {date}")
+        setting = self.settings.get((date.year, date.month), '{"current_display":[]}')
+        return {'data': [{'day': date.isoformat(), 'setting': setting}]}
+
+
+def watcher(months, past_interval=None):
+    clock = FakeClock()
+    menus = FakeMenus(months)
+    changes = []
+    w = Watcher(
+        [WatchTarget(district_id=1, menu_id=2)],
+        lambda target, month, menu: changes.append((month.year, month.month)),
+        menus=menus, min_interval=10, max_interval=80, past_interval=past_interval,
+        months_interval=1000, clock=clock, sleep=clock.sleep
+    )
+    return w, clock, menus, changes
+
+
+def test_first_poll_reports_every_month():
+    now = datetime.now()
+    w, clock, menus, changes = watcher([datetime(now.year, now.month, 1)])
+    assert w.poll_due() == 1
+    assert changes == [(now.year, now.month)]
+
+
+def test_unchanged_month_backs_off():
+    now = datetime.now()
+    w, clock, menus, changes = watcher([datetime(now.year, now.month, 1)])
+    w.poll_due()
+    intervals = []
+    for _ in range(5):
+        clock.sleep(w.next_due() - clock())
+        w.poll_due()
+        intervals.append(w.states(w.targets[0])[(now.year, now.month)].interval)
+    assert intervals == [20, 40, 80, 80, 80]
+    assert len(changes) == 1
+
+
+def test_changed_month_resets_interval():
+    now = datetime.now()
+    w, clock, menus, changes = watcher([datetime(now.year, now.month, 1)])
+    w.poll_due()
+    clock.sleep(10)
+    w.poll_due()
+    state = w.states(w.targets[0])[(now.year, now.month)]
+    assert state.interval == 20
+    menus.settings[(now.year, now.month)] = '{"current_display":[{"type":"recipe","name":"Tacos"}]}'
+    clock.sleep(20)
+    assert w.poll_due() == 1
+    assert state.interval == 10
+    assert state.changes == 1
+
+
+def test_past_month_polled_once():
+    w, clock, menus, changes = watcher([datetime(2020, 1, 1)])
+    w.poll_due()
+    clock.sleep(500)
+    w.poll_due()
+    assert menus.calls.count(datetime(2020, 1, 1)) == 1
+    assert w.states(w.targets[0])[(2020, 1)].next_poll is None
+
+
+def test_failing_month_does_not_block_other_targets():
+    now = datetime.now()
+    month = datetime(now.year, now.month, 1)
+    clock = FakeClock()
+    menus = FakeMenus([month], failing=(1,))
+    changes = []
+    errors = []
+    w = Watcher(
+        [WatchTarget(district_id=1, menu_id=1), WatchTarget(district_id=1, menu_id=2)],
+        lambda target, month, menu: changes.append(target.menu_id),
+        menus=menus, min_interval=10, max_interval=80, clock=clock, sleep=clock.sleep
+    )
+    for _ in range(3):
+        w.poll_due(on_error=errors.append)
+        clock.sleep(w.next_due() - clock())
+    assert changes == [2]
+    assert len(errors) == 2
+    assert w.states(w.targets[0])[(now.year, now.month)].interval == 40
+    with pytest.raises(ValueError):
+        clock.sleep(100)
+        w.poll_due()
+
+
+def test_no_targets_returns():
+    w = Watcher([], lambda target, month, menu: None, menus=FakeMenus([]))
+    assert w.next_due() is None
+    w.run()
+
+
+def test_month_polled_once_every_target_succeeds():
+    now = datetime.now()
+    key = (now.year, now.month)
+    clock = FakeClock()
+    menus = FakeMenus([datetime(now.year, now.month, 1)], failing=(2,))
+    polled = []
+    w = Watcher(
+        [WatchTarget(district_id=1, menu_id=1), WatchTarget(district_id=1, menu_id=2, menu_type="breakfast")],
+        lambda target, month, menu: None,
+        menus=menus, min_interval=10, max_interval=80, clock=clock, sleep=clock.sleep
+    )
+    cycles = iter(range(2))
+    w.run(stop=lambda: next(cycles, None) is None, on_error=lambda e: None,
+          on_cycle=lambda: polled.append(w.is_polled(key)))
+    menus.failing = ()
+    cycles = iter(range(1))
+    w.run(stop=lambda: next(cycles, None) is None, on_cycle=lambda: polled.append(w.is_polled(key)))
+    assert polled == [False, False, True]
+    assert not w.is_finished(key)
+
+
+def test_past_month_finished_after_first_poll():
+    w, clock, menus, changes = watcher([datetime(2020, 1, 1)])
+    assert not w.is_polled((2020, 1))
+    w.poll_due()
+    assert w.is_finished((2020, 1))